@@ -26,5 +26,9 @@ def create_app(config_class=Config):
     from app.events import bp as events_bp
     app.register_blueprint(events_bp, url_prefix='/events')
     
+    # Профилирование запросов
+    from app.profiler import init_profiler
+    init_profiler(app)
+    
     return app
 
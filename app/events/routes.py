@@ -3,7 +3,7 @@ from flask_login import current_user, login_required
 from app.events import bp
 from app.events.forms import EventForm, EventEditForm, VolunteerRegistrationForm
 from app.models import Event, VolunteerRegistration, db
-from app.utils import save_image, sanitize_html
+from app.utils import save_image, release_image, sanitize_html
 
 @bp.route('/')
 def event_list():
@@ -113,6 +113,9 @@ def delete_event(event_id):
     event_title = event.title
     
     try:
+        # Освобождаем изображение; сам файл удалит sweep_images.py
+        release_image(event.image_filename)
+        
         # Удаляем мероприятие (каскадное удаление регистраций произойдет автоматически)
         db.session.delete(event)
         db.session.commit()
@@ -1,21 +1,116 @@
 from flask import render_template, request, current_app
 from flask_login import current_user
-from datetime import date
+from datetime import date, datetime
+from sqlalchemy import case, extract, func
 from app.main import bp
-from app.models import Event
+from app.models import Event, db
+from app.utils import sanitize_html
+
+# Сколько мест проведения показывать в фасете
+LOCATION_FACET_LIMIT = 20
+
+def parse_date(value):
+    """Разбирает дату из параметра запроса в формате ГГГГ-ММ-ДД"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+def get_filters(args):
+    """Собирает активные фильтры из параметров запроса"""
+    filters = {
+        'location': args.get('location', '').strip() or None,
+        'date_from': parse_date(args.get('date_from')),
+        'date_to': parse_date(args.get('date_to')),
+        'status': args.get('status') if args.get('status') in ('open', 'closed') else None,
+    }
+    return filters
+
+def filter_conditions(filters, exclude=None):
+    """Условия WHERE для фильтров; exclude — фасет, собственный фильтр которого не применяется"""
+    # Показываем только будущие мероприятия
+    conditions = [Event.date >= date.today()]
+
+    if filters['location'] and exclude != 'location':
+        # Место хранится после sanitize_html, поэтому ввод приводим к тому же виду.
+        # Поиск по префиксу диапазоном, чтобы использовался индекс (location, date)
+        prefix = sanitize_html(filters['location'])
+        conditions.append(Event.location >= prefix)
+        conditions.append(Event.location < prefix + '\U0010ffff')
+    if exclude != 'month':
+        if filters['date_from']:
+            conditions.append(Event.date >= filters['date_from'])
+        if filters['date_to']:
+            conditions.append(Event.date <= filters['date_to'])
+    if filters['status'] and exclude != 'status':
+        if filters['status'] == 'open':
+            conditions.append(Event.is_registration_open)
+        else:
+            conditions.append(db.not_(Event.is_registration_open))
+    return conditions
+
+def get_facets(filters):
+    """Подсчитывает фасеты сгруппированными запросами.
+
+    Каждый фасет считается с учётом всех остальных фильтров, кроме своего,
+    чтобы пользователь видел, сколько мероприятий даст выбор другого значения.
+    """
+    count = func.count(Event.id)
+
+    locations = db.session.query(Event.location, count) \
+        .filter(*filter_conditions(filters, exclude='location')) \
+        .group_by(Event.location) \
+        .order_by(count.desc(), Event.location) \
+        .limit(LOCATION_FACET_LIMIT).all()
+
+    year = extract('year', Event.date)
+    month = extract('month', Event.date)
+    months = db.session.query(year, month, count) \
+        .filter(*filter_conditions(filters, exclude='month')) \
+        .group_by(year, month) \
+        .order_by(year, month).all()
+
+    is_open = case((Event.is_registration_open, 'open'), else_='closed')
+    statuses = dict(db.session.query(is_open, count)
+        .filter(*filter_conditions(filters, exclude='status'))
+        .group_by(is_open).all())
+
+    return {
+        'locations': locations,
+        'months': [(date(int(y), int(m), 1), n) for y, m, n in months],
+        'status': {'open': statuses.get('open', 0), 'closed': statuses.get('closed', 0)},
+    }
+
+def month_bounds(month_start):
+    """Первый и последний день месяца"""
+    if month_start.month == 12:
+        next_month = date(month_start.year + 1, 1, 1)
+    else:
+        next_month = date(month_start.year, month_start.month + 1, 1)
+    return month_start, date.fromordinal(next_month.toordinal() - 1)
 
 @bp.route('/')
 @bp.route('/index')
 def index():
     page = request.args.get('page', 1, type=int)
     per_page = 10
-    
-    # Получаем только будущие мероприятия, отсортированные по дате (сначала новые)
-    events_query = Event.query.filter(Event.date >= date.today()).order_by(Event.date.asc())
-    
+
+    filters = get_filters(request.args)
+
+    # Получаем будущие мероприятия с учётом фильтров, отсортированные по дате (сначала ближайшие)
+    events_query = Event.query.filter(*filter_conditions(filters)).order_by(Event.date.asc(), Event.id.asc())
+
     # Пагинация
     events = events_query.paginate(
         page=page, per_page=per_page, error_out=False
     )
-    
-    return render_template('main/index.html', events=events)
\ No newline at end of file
+
+    # Параметры фильтров для ссылок пагинации и фасетов
+    filter_args = {key: (value.isoformat() if isinstance(value, date) else value)
+                   for key, value in filters.items() if value}
+
+    return render_template('main/index.html', events=events,
+                           filters=filters, filter_args=filter_args,
+                           facets=get_facets(filters), month_bounds=month_bounds)
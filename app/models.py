@@ -2,6 +2,7 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy.ext.hybrid import hybrid_property
 from datetime import date
 import markdown
 
@@ -64,10 +65,20 @@ class Event(db.Model):
     location = db.Column(db.String(200), nullable=False)
     required_volunteers = db.Column(db.Integer, nullable=False)
     image_filename = db.Column(db.String(255), nullable=False)
+    # Денормализованный счётчик принятых волонтёров, обновляется в accept_volunteer.
+    # Для существующей базы после добавления столбца выполните backfill_accepted_count.py
+    accepted_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Внешний ключ для организатора
     organizer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
+    # Индексы для фильтрации и фасетов на главной странице
+    __table_args__ = (
+        # Покрывает фильтр и фасет статуса набора (is_registration_open) без чтения строк таблицы
+        db.Index('ix_event_date_status', 'date', 'accepted_count', 'required_volunteers'),
+        db.Index('ix_event_location_date', 'location', 'date'),
+    )
+    
     # Связи
     volunteers = db.relationship('User', secondary=event_volunteers, lazy='subquery',
         backref=db.backref('events_as_volunteer', lazy=True))
@@ -76,17 +87,20 @@ class Event(db.Model):
     @property
     def volunteers_count(self):
         """Количество ПРИНЯТЫХ волонтёров"""
-        return VolunteerRegistration.query.filter_by(
-            event_id=self.id, 
-            status='accepted'
-        ).count()
+        return self.accepted_count or 0
     
-    @property
+    @hybrid_property
     def is_registration_open(self):
         #Открыта ли регистрация (не прошла дата и не набрано волонтёров)
         from datetime import date
         return self.date >= date.today() and self.volunteers_count < self.required_volunteers
     
+    @is_registration_open.expression
+    def is_registration_open(cls):
+        # SQL-вариант для фильтрации и подсчёта фасетов в запросах
+        from datetime import date
+        return db.and_(cls.date >= date.today(), cls.accepted_count < cls.required_volunteers)
+    
     @property
     def registration_status(self):
         #Статус регистрации для отображения
@@ -130,9 +144,15 @@ class Event(db.Model):
     
     def accept_volunteer(self, registration_id):
         """Принимает волонтёра и обрабатывает автоматическое отклонение остальных при наборе лимита"""
-        registration = VolunteerRegistration.query.get(registration_id)
+        registration = VolunteerRegistration.query.filter_by(
+            id=registration_id,
+            event_id=self.id
+        ).first()
         if registration and registration.status == 'pending':
             registration.status = 'accepted'
+            # Инкремент в SQL, чтобы параллельные подтверждения не теряли обновления
+            self.accepted_count = Event.accepted_count + 1
+            db.session.flush()
             
             # Проверяем, набралось ли нужное количество волонтёров
             if self.volunteers_count >= self.required_volunteers:
@@ -147,7 +167,10 @@ class Event(db.Model):
     
     def reject_volunteer(self, registration_id):
         """Отклоняет заявку волонтёра"""
-        registration = VolunteerRegistration.query.get(registration_id)
+        registration = VolunteerRegistration.query.filter_by(
+            id=registration_id,
+            event_id=self.id
+        ).first()
         if registration and registration.status == 'pending':
             registration.status = 'rejected'
             db.session.commit()
@@ -171,6 +194,19 @@ class VolunteerRegistration(db.Model):
     # Уникальный constraint чтобы один волонтер не мог дважды зарегистрироваться на одно мероприятие
     __table_args__ = (db.UniqueConstraint('event_id', 'volunteer_id', name='unique_event_volunteer'),)
 
+# Изображения, сохранённые по хэшу содержимого. В существующей базе таблицу
+# создаёт migrate_stored_images.py, файлы без ссылок удаляет sweep_images.py
+class StoredImage(db.Model):
+    __tablename__ = 'stored_image'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # SHA-256 содержимого файла, по нему же строится имя файла
+    content_hash = db.Column(db.String(64), nullable=False, unique=True)
+    filename = db.Column(db.String(255), nullable=False, unique=True)
+    size = db.Column(db.Integer, nullable=False)
+    # Количество мероприятий, использующих изображение
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+
 # Перенесем функцию sanitize_html прямо в models.py
 def sanitize_html(html_content):
     """Очистка HTML контента от потенциально опасных тегов"""
@@ -0,0 +1,127 @@
+import io
+import os
+import random
+import cProfile
+import pstats
+from datetime import datetime
+from uuid import uuid4
+from flask import g, request
+from flask_login import current_user
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_ARG = '_profile'
+SUMMARY_FILENAME = 'summary.txt'
+
+def init_profiler(app):
+    """Подключает выборочное профилирование запросов через cProfile.
+
+    Запрос профилируется, если PROFILER_ENABLED включён и он попал в выборку
+    PROFILER_SAMPLE_RATE, либо если администратор явно запросил профиль
+    заголовком X-Profile: 1 или параметром ?_profile=1.
+    """
+    # Число сохранённых этим процессом профилей по эндпоинтам
+    dump_counts = {}
+
+    @app.before_request
+    def start_profiling():
+        if request.endpoint == 'static' or not should_profile(app):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # В этом потоке уже работает другой профилировщик
+            return
+        g._profiler = profiler
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        profiler = g.pop('_profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        endpoint = request.endpoint or 'unknown'
+        dump_counts[endpoint] = dump_counts.get(endpoint, 0) + 1
+        # Сводку перестраиваем на первом и каждом PROFILER_SUMMARY_EVERY-м профиле,
+        # чтобы не разбирать все файлы на каждом запросе
+        summary_every = max(1, int(app.config.get('PROFILER_SUMMARY_EVERY', 10) or 1))
+        rebuild_summary = (dump_counts[endpoint] - 1) % summary_every == 0
+        try:
+            save_profile(app, profiler, endpoint, rebuild_summary)
+        except Exception as e:
+            # Профилирование не должно ломать уже обработанный запрос
+            app.logger.error(f'Error saving profile: {e}')
+
+def should_profile(app):
+    """Решает, нужно ли профилировать текущий запрос"""
+    if profile_requested() and is_admin():
+        return True
+    if not app.config.get('PROFILER_ENABLED'):
+        return False
+    return random.random() < app.config.get('PROFILER_SAMPLE_RATE', 0.0)
+
+def profile_requested():
+    """Запрошен ли профиль заголовком или параметром запроса"""
+    return request.headers.get(PROFILE_HEADER) == '1' or request.args.get(PROFILE_QUERY_ARG) == '1'
+
+def is_admin():
+    return current_user.is_authenticated and current_user.role.name == 'administrator'
+
+def save_profile(app, profiler, endpoint, rebuild_summary=True):
+    """Сохраняет профиль в папку эндпоинта, удаляет старые и при необходимости обновляет сводку"""
+    endpoint_dir = os.path.join(app.config['PROFILER_DIR'], endpoint)
+    os.makedirs(endpoint_dir, exist_ok=True)
+
+    # Пишем во временный файл и атомарно переименовываем, чтобы другие
+    # процессы не прочитали недописанный профиль
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    profile_path = os.path.join(endpoint_dir, f'{timestamp}_{uuid4().hex[:8]}.prof')
+    tmp_path = profile_path + '.tmp'
+    try:
+        profiler.dump_stats(tmp_path)
+        os.replace(tmp_path, profile_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    profiles = rotate_profiles(endpoint_dir, app.config.get('PROFILER_MAX_FILES', 20))
+    if rebuild_summary:
+        write_summary(endpoint_dir, endpoint, profiles, app.config.get('PROFILER_TOP_N', 25))
+
+def rotate_profiles(endpoint_dir, max_files):
+    """Оставляет только max_files самых новых профилей, возвращает их пути"""
+    profiles = sorted(name for name in os.listdir(endpoint_dir) if name.endswith('.prof'))
+    for name in profiles[:-max_files]:
+        try:
+            os.remove(os.path.join(endpoint_dir, name))
+        except FileNotFoundError:
+            pass
+    return [os.path.join(endpoint_dir, name) for name in profiles[-max_files:]]
+
+def write_summary(endpoint_dir, endpoint, profiles, top_n):
+    """Пишет сводку топ-функций по суммарному (cumulative) времени по всем сохранённым профилям"""
+    stats = None
+    loaded = 0
+    output = io.StringIO()
+    for path in profiles:
+        # Файл мог быть удалён ротацией в другом процессе или оказаться повреждённым
+        try:
+            if stats is None:
+                stats = pstats.Stats(path, stream=output)
+            else:
+                stats.add(path)
+        except (OSError, EOFError, ValueError, TypeError):
+            continue
+        loaded += 1
+    if stats is None:
+        return
+
+    output.write(f'Endpoint: {endpoint}\nProfiles: {loaded}\n\n')
+    stats.sort_stats('cumulative').print_stats(top_n)
+
+    summary_path = os.path.join(endpoint_dir, SUMMARY_FILENAME)
+    tmp_path = f'{summary_path}.{uuid4().hex[:8]}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(output.getvalue())
+    os.replace(tmp_path, summary_path)
@@ -1,7 +1,11 @@
 import os
+import re
+import time
+import hashlib
+import tempfile
 import bleach
-from werkzeug.utils import secure_filename
 from flask import current_app
+from sqlalchemy.exc import IntegrityError
 
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif'}
 
@@ -9,22 +13,144 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def save_image(file):
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # Добавляем timestamp к имени файла для уникальности
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_")
-        filename = timestamp + filename
-        
-        upload_folder = current_app.config.get('UPLOAD_FOLDER', 'app/static/uploads')
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-        return filename
+# Сигнатуры (magic bytes) поддерживаемых форматов и расширение для хранения
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+CHUNK_SIZE = 64 * 1024
+
+# Имена файлов, которые создаёт save_image, и его временные файлы
+STORED_IMAGE_RE = re.compile(r'^[0-9a-f]{64}\.(jpg|png|gif)$')
+TEMP_UPLOAD_PREFIX = '.upload_'
+
+def detect_image_type(header):
+    """Определяет формат изображения по первым байтам файла, не декодируя его целиком"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
     return None
 
+def save_image(file):
+    """Сохраняет загруженное изображение под именем по SHA-256 содержимого.
+
+    Файл потоково пишется во временный файл в папке загрузок с одновременным
+    подсчётом хэша. Сначала в базе берётся ссылка на StoredImage, затем
+    временный файл атомарно переносится на место: свежий mtime защищает файл
+    от sweep_orphaned_images, пока транзакция не закоммичена.
+    Коммит сессии остаётся за вызывающим кодом.
+    """
+    from app import db
+    from app.models import StoredImage
+
+    if not file or not allowed_file(file.filename):
+        return None
+
+    upload_folder = current_app.config.get('UPLOAD_FOLDER', 'app/static/uploads')
+    os.makedirs(upload_folder, exist_ok=True)
+
+    stream = file.stream
+    header = stream.read(CHUNK_SIZE)
+    extension = detect_image_type(header)
+    if extension is None:
+        return None
+
+    digest = hashlib.sha256()
+    size = 0
+    # Временный файл в той же папке, чтобы os.replace был атомарным
+    fd, tmp_path = tempfile.mkstemp(dir=upload_folder, prefix=TEMP_UPLOAD_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            chunk = header
+            while chunk:
+                digest.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+                chunk = stream.read(CHUNK_SIZE)
+
+        content_hash = digest.hexdigest()
+        filename = f'{content_hash}.{extension}'
+
+        # Счётчик меняем в SQL, чтобы параллельные запросы не теряли инкременты
+        if not increment_image_refs(content_hash):
+            try:
+                with db.session.begin_nested():
+                    db.session.add(StoredImage(content_hash=content_hash, filename=filename, size=size, ref_count=1))
+            except IntegrityError:
+                # Тот же файл одновременно загрузили в другом запросе
+                increment_image_refs(content_hash)
+
+        # Заменяем файл даже если он уже есть: содержимое то же, а mtime обновится
+        os.replace(tmp_path, os.path.join(upload_folder, filename))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return filename
+
+def increment_image_refs(content_hash):
+    """Увеличивает счётчик ссылок, возвращает число обновлённых строк"""
+    from app.models import StoredImage
+
+    return StoredImage.query.filter_by(content_hash=content_hash).update(
+        {StoredImage.ref_count: StoredImage.ref_count + 1}, synchronize_session=False)
+
+def release_image(filename):
+    """Уменьшает счётчик ссылок на изображение и удаляет запись, когда ссылок не осталось.
+
+    Сам файл не удаляется: это делает sweep_orphaned_images по истечении
+    периода ожидания. Файлы, загруженные до появления StoredImage, не учитываются.
+    """
+    from app.models import StoredImage
+
+    updated = StoredImage.query.filter_by(filename=filename).update(
+        {StoredImage.ref_count: StoredImage.ref_count - 1}, synchronize_session=False)
+    if updated:
+        StoredImage.query.filter(
+            StoredImage.filename == filename,
+            StoredImage.ref_count <= 0
+        ).delete(synchronize_session=False)
+
+def sweep_orphaned_images(grace_seconds):
+    """Удаляет файлы изображений без записи StoredImage, не изменявшиеся дольше grace_seconds.
+
+    Период ожидания защищает файлы загрузок, транзакция которых ещё не
+    закоммичена. Возвращает список удалённых файлов.
+    """
+    from app.models import StoredImage
+
+    upload_folder = current_app.config.get('UPLOAD_FOLDER', 'app/static/uploads')
+    if not os.path.isdir(upload_folder):
+        return []
+
+    cutoff = time.time() - grace_seconds
+    candidates = []
+    for name in os.listdir(upload_folder):
+        if not (STORED_IMAGE_RE.match(name) or name.startswith(TEMP_UPLOAD_PREFIX)):
+            continue
+        try:
+            if os.path.getmtime(os.path.join(upload_folder, name)) < cutoff:
+                candidates.append(name)
+        except FileNotFoundError:
+            continue
+
+    referenced = {filename for (filename,) in
+                  StoredImage.query.with_entities(StoredImage.filename)
+                  .filter(StoredImage.filename.in_(candidates))} if candidates else set()
+
+    removed = []
+    for name in candidates:
+        if name in referenced:
+            continue
+        try:
+            os.remove(os.path.join(upload_folder, name))
+            removed.append(name)
+        except FileNotFoundError:
+            pass
+    return removed
+
 def sanitize_html(html_content):
     """Очистка HTML контента от потенциально опасных тегов"""
     allowed_tags = [
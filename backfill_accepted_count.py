@@ -0,0 +1,27 @@
+from sqlalchemy import text
+
+from app import create_app, db
+
+# Пересчитывает Event.accepted_count по принятым заявкам.
+# Запускать на существующей базе после добавления столбца:
+#   ALTER TABLE event ADD COLUMN accepted_count INTEGER NOT NULL DEFAULT 0;
+#   python backfill_accepted_count.py
+
+BACKFILL_SQL = text("""
+    UPDATE event SET accepted_count = (
+        SELECT COUNT(*) FROM volunteer_registration r
+        WHERE r.event_id = event.id AND r.status = 'accepted'
+    )
+""")
+
+app = create_app()
+
+with app.app_context():
+    # Индексы для фильтров главной страницы
+    db.session.execute(text("DROP INDEX IF EXISTS ix_event_date"))
+    db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_event_date_status ON event (date, accepted_count, required_volunteers)"))
+    db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_event_location_date ON event (location, date)"))
+    
+    result = db.session.execute(BACKFILL_SQL)
+    db.session.commit()
+    print(f"Счётчики принятых волонтёров пересчитаны для {result.rowcount} мероприятий")
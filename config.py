@@ -9,6 +9,16 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join(basedir, 'app', 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    # Файлы изображений без ссылок удаляются sweep_images.py не раньше, чем через этот срок
+    IMAGE_SWEEP_GRACE_SECONDS = 60 * 60
     
     # Настройки Flask-Login
-    REMEMBER_COOKIE_DURATION = timedelta(days=7)
\ No newline at end of file
+    REMEMBER_COOKIE_DURATION = timedelta(days=7)
+    
+    # Выборочное профилирование запросов (cProfile)
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE') or 0.01)
+    PROFILER_DIR = os.environ.get('PROFILER_DIR') or os.path.join(basedir, 'instance', 'profiles')
+    PROFILER_MAX_FILES = 20  # профилей на эндпоинт
+    PROFILER_TOP_N = 25  # функций в сводке
+    PROFILER_SUMMARY_EVERY = 10  # сводка пересобирается раз в N профилей
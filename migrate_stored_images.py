@@ -0,0 +1,12 @@
+from app import create_app, db
+from app.models import StoredImage
+
+# Создаёт таблицу stored_image в существующей базе (для хранения изображений
+# по хэшу содержимого). Безопасно запускать повторно:
+#   python migrate_stored_images.py
+
+app = create_app()
+
+with app.app_context():
+    StoredImage.__table__.create(db.engine, checkfirst=True)
+    print("Таблица stored_image создана (или уже существовала)")
@@ -1,5 +1,5 @@
 from app import create_app, db
-from app.models import User, Role, Event, VolunteerRegistration
+from app.models import User, Role, Event, VolunteerRegistration, StoredImage
 
 app = create_app()
 
@@ -10,7 +10,8 @@ def make_shell_context():
         'User': User, 
         'Role': Role, 
         'Event': Event, 
-        'VolunteerRegistration': VolunteerRegistration
+        'VolunteerRegistration': VolunteerRegistration,
+        'StoredImage': StoredImage
     }
 
 if __name__ == '__main__':
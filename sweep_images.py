@@ -0,0 +1,16 @@
+from flask import current_app
+
+from app import create_app
+from app.utils import sweep_orphaned_images
+
+# Удаляет из папки загрузок изображения, на которые не ссылается ни одна
+# запись StoredImage. Запускать периодически, например из cron:
+#   python sweep_images.py
+
+app = create_app()
+
+with app.app_context():
+    removed = sweep_orphaned_images(current_app.config['IMAGE_SWEEP_GRACE_SECONDS'])
+    for filename in removed:
+        print(f"Удалён: {filename}")
+    print(f"Удалено файлов: {len(removed)}")